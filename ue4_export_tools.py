@@ -39,7 +39,8 @@
 # + is it worth copying everything to a new layer for export if destructive options are used (triangulate etc.)?
 
 
-import bpy, bmesh, os
+import bpy, bmesh, os, hashlib, math, subprocess, threading, queue, tempfile, time
+from array import array
 from bpy.props import *
 from mathutils import Vector
 
@@ -62,6 +63,28 @@ collider_prefixes = ['UCX_', 'UBX_', 'USP_', 'UCP_']
 non_collider_prefix = 'NC_'
 collider_layer = 10
 collider_draw_type = 'WIRE'
+budget_mesh_prefix = 'UE4_BUDGET_'
+budget_cache_size = 256 # maximum number of decimated meshes kept in the .blend
+budget_ratio_precision = 1000000 # decimation ratios are rounded down to this many steps
+budget_decimate_attempts = 4
+hull_mesh_prefix = 'UE4_HULL_'
+hull_cache_size = 256 # maximum number of convex hulls kept in the .blend
+export_start_prefix = 'UE4_EXPORT_START '
+export_progress_prefix = 'UE4_EXPORT_PROGRESS '
+
+# background export operators currently running, only one is allowed at a time
+background_exports = []
+
+# run by the background Blender process started by the export objects operator
+# arguments after '--' are: addon path, export path, check existing (0/1), object names...
+background_export_script = (
+  "import sys, importlib.util\n"
+  "args = sys.argv[sys.argv.index('--') + 1:]\n"
+  "spec = importlib.util.spec_from_file_location('ue4_export_tools', args[0])\n"
+  "module = importlib.util.module_from_spec(spec)\n"
+  "spec.loader.exec_module(module)\n"
+  "module.register()\n"
+  "module.run_background_export(args[3:], args[1], args[2] == '1')\n")
 
 
 
@@ -140,10 +163,49 @@ def get_path(base, filename):
 def path_exists(path):
   return os.path.exists(bpy.path.abspath(path))
 
-def make_collider(scn, ob, collider_name, use_object_copy=False):
+# copy a mesh without the hull cache properties, so copies are never mistaken for cache entries
+def copy_hull_mesh(mesh):
+  mesh_copy = mesh.copy()
+  for prop in ('ue4_hull_key', 'ue4_hull_last_used'):
+    if prop in mesh_copy:
+      del mesh_copy[prop]
+  return mesh_copy
+
+# map the keys of the hulls cached in the .blend to their meshes, build once per operator run
+def get_hull_cache():
+  return dict((mesh['ue4_hull_key'], mesh) for mesh in bpy.data.meshes if 'ue4_hull_key' in mesh)
+
+# store a copy of a generated hull in the .blend
+def cache_hull_mesh(mesh, key, hull_cache):
+  hull = copy_hull_mesh(mesh)
+  hull.name = hull_mesh_prefix + mesh.name
+  hull['ue4_hull_key'] = key
+  hull['ue4_hull_last_used'] = time.time()
+  hull.use_fake_user = True
+  hull_cache[key] = hull
+
+# remove the least recently used hulls if the cache is full, call once after generating colliders
+def evict_hull_cache(hull_cache):
+  evict_cached_meshes(list(hull_cache.values()), 'ue4_hull_last_used', hull_cache_size)
+
+def make_collider(scn, ob, collider_name, use_object_copy=False, hull_cache=None):
+  # hulls only depend on vertex positions, so reuse a cached hull if the source vertices haven't changed
+  hull_key = None
+  cached_hull = None
+  evict_hulls = hull_cache is None
+  if not use_object_copy:
+    if hull_cache is None:
+      hull_cache = get_hull_cache()
+    hull_key = get_mesh_fingerprint(ob.data, ('convex_hull', 'delete_unused'), use_topology=False)
+    cached_hull = hull_cache.get(hull_key)
+
   collider = ob.copy()
   collider.name = collider_name
-  collider.data = ob.data.copy()
+  if cached_hull is not None:
+    cached_hull['ue4_hull_last_used'] = time.time()
+    collider.data = copy_hull_mesh(cached_hull)
+  else:
+    collider.data = ob.data.copy()
   collider.data.name = collider_name
   collider.data.materials.clear()
   collider.matrix_world = ob.matrix_world.copy()
@@ -154,7 +216,7 @@ def make_collider(scn, ob, collider_name, use_object_copy=False):
   move_to_layer(collider, collider_layer)
 
   # generate convex hull using built-in function (requires edit mode with vertex selection)
-  if not use_object_copy:
+  if not use_object_copy and cached_hull is None:
     collider.select = True
     scn.objects.active = collider
     bpy.ops.object.mode_set(mode='EDIT')
@@ -167,6 +229,9 @@ def make_collider(scn, ob, collider_name, use_object_copy=False):
     bpy.ops.object.mode_set(mode='OBJECT')
     bpy.ops.object.shade_flat()
     collider.select = False
+    cache_hull_mesh(collider.data, hull_key, hull_cache)
+    if evict_hulls:
+      evict_hull_cache(hull_cache)
 
   return collider
 
@@ -206,6 +271,242 @@ def get_collider_name(base_name, num=0):
     return ('UCX_' + base_name, 0)
 
 
+# hash the vertex positions (and optionally the face topology) of a mesh together with any extra settings
+def get_mesh_fingerprint(mesh, settings=(), use_topology=True):
+  h = hashlib.md5()
+  co = array('f', [0.0]) * (len(mesh.vertices) * 3)
+  mesh.vertices.foreach_get('co', co)
+  h.update(co.tobytes())
+  if use_topology:
+    loop_totals = array('i', [0]) * len(mesh.polygons)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    h.update(loop_totals.tobytes())
+    vertex_indices = array('i', [0]) * len(mesh.loops)
+    mesh.loops.foreach_get('vertex_index', vertex_indices)
+    h.update(vertex_indices.tobytes())
+  h.update(repr(settings).encode('utf-8'))
+  return h.hexdigest()
+
+# find a cached mesh by the key stored in one of its custom properties
+def find_cached_mesh(key_prop, key):
+  for mesh in bpy.data.meshes:
+    if mesh.get(key_prop) == key:
+      return mesh
+  return None
+
+# remove the least recently used of the given cached meshes once there are more than max_size of them
+# meshes in use by an object (more users than just the fake user) are never removed
+def evict_cached_meshes(meshes, last_used_prop, max_size):
+  meshes = sorted(meshes, key=lambda m: m.get(last_used_prop, 0.0))
+  for mesh in meshes[:max(0, len(meshes) - max_size)]:
+    if mesh.users <= 1:
+      bpy.data.meshes.remove(mesh, True)
+
+def count_triangles(mesh):
+  return sum(len(p.vertices) - 2 for p in mesh.polygons)
+
+# get the lowest triangle budget of all rules matching the object name and export path (0 means no budget)
+def get_triangle_budget(rules, name, export_path):
+  budget = 0
+  export_dir = os.path.normpath(bpy.path.abspath(export_path))
+  for rule in rules:
+    if rule.prefix == '' and rule.path == '':
+      continue
+    if rule.prefix != '' and not name.startswith(rule.prefix):
+      continue
+    if rule.path != '' and os.path.normpath(bpy.path.abspath(rule.path)) != export_dir:
+      continue
+    if budget == 0 or rule.max_triangles < budget:
+      budget = rule.max_triangles
+  return budget
+
+# returns a decimated copy of the object's evaluated mesh if it is over budget, otherwise None
+# results are cached by fingerprint and ratio, so repeat exports of unchanged objects don't decimate again
+# render settings are used to match the mesh the fbx exporter writes
+def get_budget_mesh(scn, ob, budget):
+  evaluated = ob.to_mesh(scn, True, 'RENDER')
+  num_triangles = count_triangles(evaluated)
+  if num_triangles <= budget:
+    bpy.data.meshes.remove(evaluated, True)
+    remove_budget_meshes(ob.name)
+    return None
+
+  # round the ratio down so the result doesn't go over budget, but never down to nothing
+  min_ratio = 1.0 / budget_ratio_precision
+  ratio = max(min_ratio, math.floor(budget / num_triangles * budget_ratio_precision) / budget_ratio_precision)
+  key = get_mesh_fingerprint(evaluated, (ratio,))
+  decimated = find_cached_mesh('ue4_budget_key', key)
+
+  if decimated is not None:
+    decimated['ue4_budget_last_used'] = time.time()
+  else:
+    # remove stale results for this object so the cache doesn't keep growing
+    remove_budget_meshes(ob.name)
+
+    # decimation doesn't hit the ratio exactly, so keep lowering it until the result fits the budget
+    decimate_ratio = ratio
+    decimated = decimate_mesh(scn, evaluated, decimate_ratio)
+    for i in range(budget_decimate_attempts - 1):
+      num_decimated = count_triangles(decimated)
+      if num_decimated <= budget or decimate_ratio <= min_ratio:
+        break
+      bpy.data.meshes.remove(decimated, True)
+      decimate_ratio = max(min_ratio, decimate_ratio * budget / num_decimated * 0.99)
+      decimated = decimate_mesh(scn, evaluated, decimate_ratio)
+
+    decimated.name = budget_mesh_prefix + ob.name
+    decimated['ue4_budget_key'] = key
+    decimated['ue4_budget_source'] = ob.name
+    decimated.use_fake_user = True # keep the cached mesh when the file is saved
+    decimated['ue4_budget_last_used'] = time.time()
+    evict_cached_meshes(list(m for m in bpy.data.meshes if 'ue4_budget_key' in m), 'ue4_budget_last_used', budget_cache_size)
+
+  bpy.data.meshes.remove(evaluated, True)
+  return decimated
+
+# decimate a temporary object so the source object is never modified
+def decimate_mesh(scn, mesh, ratio):
+  temp_ob = bpy.data.objects.new('ue4_budget_temp', mesh)
+  scn.objects.link(temp_ob)
+  modifier = temp_ob.modifiers.new('Decimate', 'DECIMATE')
+  modifier.ratio = ratio
+  decimated = temp_ob.to_mesh(scn, True, 'RENDER')
+  scn.objects.unlink(temp_ob)
+  bpy.data.objects.remove(temp_ob, True)
+  return decimated
+
+# remove cached decimated meshes made for the named object
+def remove_budget_meshes(name):
+  stale_meshes = list(mesh for mesh in bpy.data.meshes if mesh.get('ue4_budget_source') == name)
+  for mesh in stale_meshes:
+    if mesh.users <= 1:
+      bpy.data.meshes.remove(mesh, True)
+
+# get the triangle budget for an object being exported, or 0 if it has none
+def get_object_budget(scn, ob, export_path):
+  settings = scn.export_settings
+  if not settings.enforce_budgets or ob.type != 'MESH':
+    return 0
+  return get_triangle_budget(settings.budget_rules, ob.name, export_path)
+
+# temporarily swap in a decimated mesh if the object is over budget, returns state for restore_triangle_budget
+def apply_triangle_budget(scn, ob, export_path):
+  budget = get_object_budget(scn, ob, export_path)
+  if budget < 1:
+    return None
+  decimated = get_budget_mesh(scn, ob, budget)
+  if decimated is None:
+    return None
+
+  # modifiers are already applied to the decimated mesh, so disable them for both viewport and render
+  modifier_states = list((mod, mod.show_viewport, mod.show_render) for mod in ob.modifiers)
+  for mod in ob.modifiers:
+    mod.show_viewport = False
+    mod.show_render = False
+  original_data = ob.data
+  ob.data = decimated
+  return (original_data, modifier_states)
+
+def restore_triangle_budget(ob, state):
+  if state is None:
+    return
+  ob.data = state[0]
+  for mod, show_viewport, show_render in state[1]:
+    mod.show_viewport = show_viewport
+    mod.show_render = show_render
+
+
+# export each object to its own fbx file along with its colliders, returns the number of objects decimated
+def export_objects(scn, objects, export_path, check_existing, progress_callback=None, start_callback=None):
+  # enable colliders layer so we can find colliders
+  collider_layer_visible = scn.layers[collider_layer]
+  scn.layers[collider_layer] = True
+
+  num_decimated = 0
+
+  for i, ob in enumerate(objects):
+    bpy.ops.object.select_all(action='DESELECT')
+
+    ob.select = True
+    object_location = ob.location.copy()
+    ob.location = Vector((0.0, 0.0, 0.0))
+    
+    # select and move colliders and lods
+    colliders = get_colliders(ob.name)
+    for collider in colliders:
+      collider.select = True
+      collider.location -= object_location
+
+    # lods = get_lods(ob.name)
+    # for lod in lods:
+    #   lod.select = True
+    #   lod.location = object_location
+
+    if start_callback is not None:
+      start_callback(ob)
+
+    budget_state = None
+    try:
+      budget_state = apply_triangle_budget(scn, ob, export_path)
+      if budget_state is not None:
+        num_decimated += 1
+
+      # export fbx using object name
+      path = get_path(export_path, ob.name + '.fbx')
+      bpy.ops.export_scene.fbx(filepath=path, check_existing=check_existing, use_selection=True)
+    finally:
+      # revert object positions and mesh, even if the export failed
+      restore_triangle_budget(ob, budget_state)
+      ob.location = object_location
+      for collider in colliders:
+        collider.location += object_location
+      # for lod in lods:
+      #   lod.location += object_location
+
+    if progress_callback is not None:
+      progress_callback(i + 1, num_decimated, ob)
+
+  # reset selection and layer visibility
+  select_objects(objects=objects, deselect_others=True)
+  scn.layers[collider_layer] = collider_layer_visible
+
+  return num_decimated
+
+# entry point for the background export process, progress is written to stdout for the operator to read
+def run_background_export(object_names, export_path, check_existing):
+  scn = bpy.context.scene
+  objs = bpy.data.objects
+  objects = list(objs[name] for name in object_names if objs.get(name) is not None)
+
+  def print_start(ob):
+    print(export_start_prefix + ob.name, flush=True)
+
+  def print_progress(num_exported, num_decimated, ob):
+    print('{0}{1} {2} {3}'.format(export_progress_prefix, num_exported, num_decimated, ob.name), flush=True)
+
+  export_objects(scn, objects, export_path, check_existing, print_progress, print_start)
+
+def read_process_output(stream, messages):
+  for line in iter(stream.readline, ''):
+    messages.put(line)
+  stream.close()
+
+# make a unique path for the background copy, next to the open file so relative paths still resolve
+def get_background_blend_path():
+  directory = tempfile.gettempdir()
+  if bpy.data.filepath != '':
+    directory = os.path.dirname(bpy.data.filepath)
+  fd, path = tempfile.mkstemp(prefix='.ue4_export_', suffix='.blend', dir=directory)
+  os.close(fd)
+  return path
+
+def get_export_message(num_exported, num_decimated):
+  message = 'Exported {0} object(s)'.format(num_exported)
+  if num_decimated > 0:
+    message += ', {0} decimated to fit budget'.format(num_decimated)
+  return message + '.'
+
+
 ##### EXPOSED OPERATORS #####
 class AWP_UE4ExportTools_FixObjectDataNames(bpy.types.Operator):
   """Rename data of selected objects to be the same as the object."""
@@ -320,6 +621,7 @@ class AWP_UE4ExportTools_GenerateColliders(bpy.types.Operator):
 
     colliders = []
     selected_objects = list(ob for ob in scn.objects if ob.type == 'MESH' and ob.select == True)
+    hull_cache = get_hull_cache()
 
     objs = bpy.data.objects
     for ob in selected_objects:
@@ -343,9 +645,11 @@ class AWP_UE4ExportTools_GenerateColliders(bpy.types.Operator):
       # generate colliders for objects that don't already have them
       if not has_collider(ob_name):
         collider_name = get_collider_name(ob.name)
-        collider = make_collider(scn, ob, collider_name[0], self.use_object_copy)
+        collider = make_collider(scn, ob, collider_name[0], self.use_object_copy, hull_cache)
         colliders.append(collider)
 
+    evict_hull_cache(hull_cache)
+
     if len(colliders) > 0:
       select_objects(objects=colliders, deselect_others=True)
     else:
@@ -406,12 +710,14 @@ class AWP_UE4ExportTools_ConvertSelectedToActiveColliders(bpy.types.Operator):
     num = 0
     if len(selected_objects) > 1:
       num += 1 # a value > 0 will cause make_collider to use the multi-collider naming scheme
+    hull_cache = get_hull_cache()
     for ob in selected_objects:
       collider_name = get_collider_name(active_object.name, num)
       num = collider_name[1]
-      collider = make_collider(scn, ob, collider_name[0], self.use_object_copy)
+      collider = make_collider(scn, ob, collider_name[0], self.use_object_copy, hull_cache)
       colliders.append(collider)
       num += 1
+    evict_hull_cache(hull_cache)
 
     if self.delete_converted:
       objs = bpy.data.objects
@@ -448,6 +754,12 @@ class AWP_UE4ExportTools_ExportObjects(bpy.types.Operator):
   export_path = bpy.props.StringProperty(subtype="FILE_PATH")
   check_existing = bpy.props.BoolProperty()
 
+  use_background = bpy.props.BoolProperty(
+    name = "use background",
+    default = True,
+    description = "Export in a background Blender process so the UI stays responsive. Press Esc to cancel."
+    )
+
   def invoke(self, context, event):
     self.export_path = bpy.context.scene.export_settings.path
     self.check_existing = bpy.context.scene.export_settings.check_existing
@@ -461,48 +773,183 @@ class AWP_UE4ExportTools_ExportObjects(bpy.types.Operator):
   def execute(self, context):
     scn = context.scene
 
-    # enable colliders layer so we can find colliders
-    collider_layer_visible = scn.layers[collider_layer]
-    scn.layers[collider_layer] = True
+    if self.use_background and not bpy.app.background:
+      return self.start_background_export(context)
 
     selected_objects = list(ob for ob in scn.objects if ob.select and not is_collider_name(ob.name))
+    num_decimated = export_objects(scn, selected_objects, self.export_path, self.check_existing)
 
-    for ob in selected_objects:
-      bpy.ops.object.select_all(action='DESELECT')
-
-      ob.select = True
-      object_location = ob.location.copy()
-      ob.location = Vector((0.0, 0.0, 0.0))
-      
-      # select and move colliders and lods
-      colliders = get_colliders(ob.name)
-      for collider in colliders:
-        collider.select = True
-        collider.location -= object_location
+    self.report({'INFO'}, get_export_message(len(selected_objects), num_decimated))
+    return {'FINISHED'}
 
-      # lods = get_lods(ob.name)
-      # for lod in lods:
-      #   lod.select = True
-      #   lod.location = object_location
+  def start_background_export(self, context):
+    if len(background_exports) > 0:
+      self.report({'WARNING'}, "An export is already running.")
+      return {'CANCELLED'}
 
-      # export fbx using object name
-      path = get_path(self.export_path, ob.name + '.fbx')
-      bpy.ops.export_scene.fbx(filepath=path, check_existing=self.check_existing, use_selection=True)
+    scn = context.scene
+    selected_objects = list(ob for ob in scn.objects if ob.select and not is_collider_name(ob.name))
+    if len(selected_objects) < 1:
+      self.report({'INFO'}, "No objects selected for export.")
+      return {'CANCELLED'}
+
+    background_exports.append(self)
+    self._object_names = list(ob.name for ob in selected_objects)
+    self._budget_names = list(ob.name for ob in selected_objects if get_object_budget(scn, ob, self.export_path) > 0)
+    self._export_path = bpy.path.abspath(self.export_path)
+    self._num_objects = len(self._object_names)
+    self._num_decimated_here = 0
+    self._num_exported = 0
+    self._num_decimated = 0
+    self._current_name = None
+    self._last_output = ''
+    self._blend_path = None
+    self._process = None
+
+    wm = context.window_manager
+    self._window = context.window
+    wm.progress_begin(0, self._num_objects)
+    self._timer = wm.event_timer_add(0.1, self._window)
+    wm.modal_handler_add(self)
+    self.update_header_text()
+    return {'RUNNING_MODAL'}
 
-      # revert object positions
-      ob.location = object_location
-      for collider in colliders:
-        collider.location += object_location
-      # for lod in lods:
-      #   lod.location += object_location
+  # decimate one object over budget per timer event, so the results are cached in the open file and the
+  # UI only blocks for one object at a time
+  def decimate_next(self, context):
+    scn = context.scene
+    name = self._budget_names.pop(0)
+    ob = bpy.data.objects.get(name)
+    if ob is not None:
+      budget = get_object_budget(scn, ob, self.export_path)
+      if budget > 0:
+        get_budget_mesh(scn, ob, budget)
+    self._num_decimated_here += 1
+    self.update_header_text()
+
+  def start_process(self):
+    # the background process works on a copy of the file, so the open scene is never modified
+    self._blend_path = get_background_blend_path()
+    bpy.ops.wm.save_as_mainfile(filepath=self._blend_path, copy=True)
+
+    args = [bpy.app.binary_path, '--background', '--factory-startup', self._blend_path,
+      '--python-exit-code', '1', '--python-expr', background_export_script, '--',
+      os.path.abspath(__file__), self._export_path, '1' if self.check_existing else '0']
+    args.extend(self._object_names)
+
+    self._process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    self._messages = queue.Queue()
+    self._reader = threading.Thread(target=read_process_output, args=(self._process.stdout, self._messages))
+    self._reader.daemon = True
+    self._reader.start()
+    self._current_name = None
+    self.update_header_text()
+
+  def modal(self, context, event):
+    # only the press, so releasing Esc after cancelling something else doesn't stop the export
+    if event.type == 'ESC' and event.value == 'PRESS':
+      return self.cancel_background_export(context)
+
+    if event.type == 'TIMER':
+      if self._process is None:
+        if len(self._budget_names) > 0:
+          self.decimate_next(context)
+        else:
+          self.start_process()
+        return {'PASS_THROUGH'}
+
+      exit_code = self._process.poll()
+      if exit_code is not None:
+        self._reader.join()
+      self.read_progress(context)
+
+      if exit_code is not None:
+        self.finish_background_export(context)
+        if exit_code != 0:
+          self.report({'ERROR'}, 'Export failed: ' + self._last_output)
+          return {'CANCELLED'}
+        self.report({'INFO'}, get_export_message(self._num_exported, self._num_decimated))
+        return {'FINISHED'}
+
+    # let the user carry on working while the export runs
+    return {'PASS_THROUGH'}
+
+  # called by Blender if the modal handler is removed (file loaded, window closed or Blender quit)
+  def cancel(self, context):
+    self.stop_process()
+    self.finish_background_export(context)
+
+  def cancel_background_export(self, context):
+    message = 'Export cancelled after {0} of {1} object(s).'
+    if self._process is not None:
+      self.stop_process()
+      # read everything the process wrote before it stopped, so only the incomplete file is removed
+      self._reader.join()
+      self.read_progress(context)
+
+      # the object being written when the process stopped leaves an incomplete file behind
+      if self._current_name is not None:
+        path = get_path(self._export_path, self._current_name + '.fbx')
+        if os.path.exists(path):
+          os.remove(path)
+          message += ' Removed incomplete file {0}.'.format(path)
+
+    self.finish_background_export(context)
+    self.report({'WARNING'}, message.format(self._num_exported, self._num_objects))
+    return {'CANCELLED'}
+
+  def stop_process(self):
+    if self._process is not None and self._process.poll() is None:
+      self._process.terminate()
+      self._process.wait()
+
+  def read_progress(self, context):
+    while not self._messages.empty():
+      line = self._messages.get().strip()
+      if line.startswith(export_start_prefix):
+        self._current_name = line[len(export_start_prefix):]
+      elif line.startswith(export_progress_prefix):
+        values = line[len(export_progress_prefix):].split(' ', 2)
+        self._num_exported = int(values[0])
+        self._num_decimated = int(values[1])
+        self._current_name = None
+      elif line != '':
+        self._last_output = line
+    context.window_manager.progress_update(self._num_exported)
+    self.update_header_text()
+
+  # show progress in the header of every 3D view in the window the export was started from
+  def update_header_text(self, clear=False):
+    if self._process is None:
+      text = 'Decimating {0}/{1}'.format(self._num_decimated_here, self._num_decimated_here + len(self._budget_names))
+      if len(self._budget_names) > 0:
+        text += ': ' + self._budget_names[0]
+    else:
+      text = 'Exporting {0}/{1}'.format(self._num_exported, self._num_objects)
+      if self._current_name is not None:
+        text += ': ' + self._current_name
+    text += ' (Esc to cancel)'
+
+    for area in self._window.screen.areas:
+      if area.type == 'VIEW_3D':
+        if clear:
+          area.header_text_set()
+        else:
+          area.header_text_set(text)
 
-    # reset selection and layer visibility
-    select_objects(objects=selected_objects, deselect_others=True)
-    scn.layers[collider_layer] = collider_layer_visible
+  def finish_background_export(self, context):
+    wm = context.window_manager
+    wm.event_timer_remove(self._timer)
+    wm.progress_end()
+    self.update_header_text(clear=True)
+    if self in background_exports:
+      background_exports.remove(self)
 
-    message = 'Exported {0} object(s).'.format(len(selected_objects))
-    self.report({'INFO'}, message)
-    return {'FINISHED'}
+    # remove the copy and any backup Blender made when saving over the placeholder file
+    if self._blend_path is not None:
+      for path in (self._blend_path, self._blend_path + '1'):
+        if os.path.exists(path):
+          os.remove(path)
 
 
 class AWP_UE4ExportTools_ExportScene(bpy.types.Operator):
@@ -537,9 +984,21 @@ class AWP_UE4ExportTools_ExportScene(bpy.types.Operator):
     scn.layers[collider_layer] = True
     bpy.ops.object.select_all(action='SELECT')
 
-    # open fbx export dialogue
-    path = get_path(self.export_path, 'scene_export.fbx')
-    bpy.ops.export_scene.fbx(filepath=path, check_existing=self.check_existing, use_selection=True)
+    budget_states = []
+    try:
+      for ob in scn.objects:
+        if ob.select and not is_collider_name(ob.name):
+          budget_state = apply_triangle_budget(scn, ob, self.export_path)
+          if budget_state is not None:
+            budget_states.append((ob, budget_state))
+
+      # open fbx export dialogue
+      path = get_path(self.export_path, 'scene_export.fbx')
+      bpy.ops.export_scene.fbx(filepath=path, check_existing=self.check_existing, use_selection=True)
+    finally:
+      # always give the objects their own meshes back, even if the export failed
+      for ob, budget_state in budget_states:
+        restore_triangle_budget(ob, budget_state)
 
     # restore selection and layer visibility
     select_objects(objects=selected_objects, deselect_others=True)
@@ -605,6 +1064,55 @@ class AWP_UE4ExportTools_SetBlenderSceneScale(bpy.types.Operator):
     return {'FINISHED'}
 
 
+class AWP_UE4ExportTools_AddBudgetRule(bpy.types.Operator):
+  """Add a triangle budget rule"""
+  bl_idname = 'awp_ue4.add_budget_rule'
+  bl_label = 'UE4 Add Budget Rule'
+  bl_options = {'REGISTER', 'UNDO'}
+
+  def execute(self, context):
+    context.scene.export_settings.budget_rules.add()
+    return {'FINISHED'}
+
+
+class AWP_UE4ExportTools_RemoveBudgetRule(bpy.types.Operator):
+  """Remove a triangle budget rule"""
+  bl_idname = 'awp_ue4.remove_budget_rule'
+  bl_label = 'UE4 Remove Budget Rule'
+  bl_options = {'REGISTER', 'UNDO'}
+
+  index = bpy.props.IntProperty(
+    name = "index",
+    default = 0,
+    description = "Index of the rule to remove."
+    )
+
+  def execute(self, context):
+    rules = context.scene.export_settings.budget_rules
+    if 0 <= self.index < len(rules):
+      rules.remove(self.index)
+    return {'FINISHED'}
+
+
+# Triangle budget applied to objects matching the prefix and/or export path
+class AWP_BudgetRule(bpy.types.PropertyGroup):
+    prefix = StringProperty(
+        name="Prefix",
+        description="Apply to objects with names starting with this prefix",
+        default="")
+    path = StringProperty(
+        name="Path",
+        description="Apply to objects exported to this directory",
+        default="",
+        maxlen=1024,
+        subtype='DIR_PATH')
+    max_triangles = IntProperty(
+        name="Max Triangles",
+        description="Objects with more triangles are decimated on export",
+        default=5000,
+        min=1)
+
+
 # Required by the path selector in the UI
 class AWP_ExportSettings(bpy.types.PropertyGroup):
     path = StringProperty(
@@ -617,6 +1125,11 @@ class AWP_ExportSettings(bpy.types.PropertyGroup):
         name="",
         description="Check for existing files",
         default=False)
+    enforce_budgets = BoolProperty(
+        name="",
+        description="Decimate objects that are over their triangle budget on export",
+        default=True)
+    budget_rules = CollectionProperty(type=AWP_BudgetRule)
 
 
 ##### MAIN CLASS, UI AND REGISTRATION #####
@@ -672,6 +1185,21 @@ class AWP_UE4ExportToolsPanel(bpy.types.Panel):
     # row = col.row(align=True)
     # col.prop(context.scene.export_settings, 'check_existing', text="Check Existing")
 
+    col = layout.column(align=True)
+    row = col.row(align=True)
+    row.label("Triangle Budgets:")
+    row.prop(context.scene.export_settings, 'enforce_budgets', text="")
+    for i, rule in enumerate(context.scene.export_settings.budget_rules):
+      box = layout.box()
+      col = box.column(align=True)
+      row = col.row(align=True)
+      row.prop(rule, 'max_triangles')
+      row.operator('awp_ue4.remove_budget_rule', "", icon='X').index = i
+      col.prop(rule, 'prefix')
+      col.prop(rule, 'path')
+    row = layout.row(align=True)
+    row.operator('awp_ue4.add_budget_rule', "Add Budget Rule")
+
 
 ##### OPERATOR REGISTRATION #####
 def register():
@@ -685,7 +1213,10 @@ def register():
   bpy.utils.register_class(AWP_UE4ExportTools_ConvertSelectedToActiveColliders)
   bpy.utils.register_class(AWP_UE4ExportTools_SetUnrealSceneScale)
   bpy.utils.register_class(AWP_UE4ExportTools_SetBlenderSceneScale)
+  bpy.utils.register_class(AWP_UE4ExportTools_AddBudgetRule)
+  bpy.utils.register_class(AWP_UE4ExportTools_RemoveBudgetRule)
 
+  bpy.utils.register_class(AWP_BudgetRule)
   bpy.utils.register_class(AWP_ExportSettings)
   bpy.types.Scene.export_settings = PointerProperty(type=AWP_ExportSettings)
 
@@ -700,8 +1231,11 @@ def unregister():
   bpy.utils.unregister_class(AWP_UE4ExportTools_ConvertSelectedToActiveColliders)
   bpy.utils.unregister_class(AWP_UE4ExportTools_SetUnrealSceneScale)
   bpy.utils.unregister_class(AWP_UE4ExportTools_SetBlenderSceneScale)
+  bpy.utils.unregister_class(AWP_UE4ExportTools_AddBudgetRule)
+  bpy.utils.unregister_class(AWP_UE4ExportTools_RemoveBudgetRule)
 
   bpy.utils.unregister_class(AWP_ExportSettings)
+  bpy.utils.unregister_class(AWP_BudgetRule)
   del bpy.types.Scene.export_settings
 
 # allows running addon from text editor